@@ -1,7 +1,13 @@
 import wx
 import wx.lib.newevent
 import os
+import hashlib
+import io
+import pickle
+import tempfile
+import re
 import threading
+import queue
 import pyttsx3
 import warnings
 
@@ -9,6 +15,15 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module='ebooklib')
 
 # Optional libraries for formats
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:
+    try:
+        # PyMuPDF before 1.24.3 only has the deprecated fitz name
+        import fitz
+    except ImportError:
+        fitz = None
+
 try:
     from pypdf import PdfReader
 except ImportError:
@@ -17,11 +32,60 @@ except ImportError:
 try:
     import ebooklib
     from ebooklib import epub
-    from bs4 import BeautifulSoup
 except ImportError:
     epub = None
+
+# HTML text extractors, fastest first: selectolax, lxml, then BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
     BeautifulSoup = None
 
+def html_to_text(markup):
+    """Return the text of an EPUB chapter without building a soup tree when possible."""
+    if not markup:
+        return ""
+    if SelectolaxParser:
+        return SelectolaxParser(markup).text(separator='')
+    if lxml:
+        # lxml would guess latin-1 for raw bytes; ebooklib hands out UTF-8
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', 'replace')
+        try:
+            return lxml.html.fromstring(markup).text_content()
+        except lxml.etree.ParserError:
+            # Whitespace- or comment-only chapters have no document to parse
+            return ""
+    return BeautifulSoup(markup, 'html.parser').get_text()
+
+# Which extractor html_to_text uses; their output differs slightly, so
+# cached EPUB text and page offsets are only valid for the same one
+if SelectolaxParser:
+    HTML_EXTRACTOR = SelectolaxParser.__module__
+elif lxml:
+    HTML_EXTRACTOR = "lxml"
+else:
+    HTML_EXTRACTOR = "bs4" if BeautifulSoup else None
+
+# Likewise for cached PDF text: pymupdf and pypdf extract it differently
+PDF_BACKEND = "pymupdf" if fitz else "pypdf"
+
+class LoadCancelled(Exception):
+    """Raised on the loader thread when a newer Open has replaced the load."""
+
 # ---------------------------------------------------------------------------
 # Offline Services
 # ---------------------------------------------------------------------------
@@ -30,41 +94,132 @@ class TTSService:
     """Handles Offline Text-to-Speech using pyttsx3."""
     def __init__(self):
         self.engine = None
-        self.is_speaking = False
-        try:
-            self.engine = pyttsx3.init()
-        except Exception as e:
-            print(f"TTS Init failed: {e}")
+        # (text, cancel) pairs waiting to be spoken
+        self._queue = queue.Queue()
+        # Each utterance has its own cancel Event, so a stop() can't be lost
+        # between the worker taking text and starting to speak it
+        self._cancel = threading.Event()
+        self._speaking = self._cancel
+
+        # A single long-lived worker creates the engine and runs every
+        # utterance, so the engine is only ever used from one thread (SAPI5
+        # and NSSpeechSynthesizer bind to the thread that created them)
+        ready = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._worker.start()
+        # Wait until init has succeeded or failed so speak()/stop() can
+        # tell whether TTS is available
+        ready.wait()
 
     def speak(self, text):
         if not self.engine:
             return
         
-        if self.is_speaking:
-            self.stop()
+        # Replace whatever is queued or playing with the new text
+        self.stop()
+        self._cancel = threading.Event()
+        self._queue.put((text, self._cancel))
 
-        self.is_speaking = True
-        
-        # TTS engine block the loop, so we run it in a thread
-        threading.Thread(target=self._speak_thread, args=(text,)).start()
-
-    def _speak_thread(self, text):
+    def _run(self, ready):
         try:
-            # We need a new engine instance for the thread or careful locking
-            # pyttsx3 is tricky with threads. 
-            # Safe approach: Run the loop inside the thread.
             engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
+            engine.connect('started-word', self._on_word)
+            self.engine = engine
         except Exception as e:
-            print(f"TTS Error: {e}")
+            print(f"TTS Init failed: {e}")
+            return
         finally:
-            self.is_speaking = False
+            ready.set()
+
+        while True:
+            text, cancel = self._queue.get()
+            if cancel.is_set():
+                continue
+            self._speaking = cancel
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+
+    def _on_word(self, name, location, length):
+        # Called from inside runAndWait() on the worker thread, the only
+        # place engine.stop() reliably interrupts the speech
+        if self._speaking.is_set():
+            self.engine.stop()
 
     def stop(self):
-        if self.engine and self.is_speaking:
-            self.engine.stop()
-            self.is_speaking = False
+        if not self.engine:
+            return
+        # Drop text that hasn't been picked up yet, then cut the current speech short
+        self._drop_pending()
+        # speak() always cancels the previous utterance first, so only the
+        # latest one can still be live
+        self._cancel.set()
+
+    def _drop_pending(self):
+        with self._queue.mutex:
+            self._queue.queue.clear()
+
+class PageCache:
+    """On-disk cache of extracted book text, keyed by path, mtime and size."""
+    # Least recently used entries are removed once the cache grows past this
+    MAX_BYTES = 256 * 1024 * 1024
+    # Bump when extraction output changes so old entries are ignored
+    VERSION = 1
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _entry_path(self, path, options):
+        st = os.stat(path)
+        key = (f"{self.VERSION}|{HTML_EXTRACTOR}|{PDF_BACKEND}|{options!r}|"
+               f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}")
+        return os.path.join(self.directory, hashlib.blake2b(key.encode()).hexdigest() + ".pickle")
+
+    def load(self, path, options=()):
+        # options: extraction settings the cached data depends on
+        try:
+            entry = self._entry_path(path, options)
+            with open(entry, 'rb') as f:
+                data = pickle.load(f)
+            # Mark as recently used so pruning keeps it
+            os.utime(entry)
+            return data
+        except Exception:
+            # Missing or unreadable entry: extract as usual
+            return None
+
+    def save(self, path, data, options=()):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entry = self._entry_path(path, options)
+            # A unique temp file, so concurrent writes of one book can't collide
+            with tempfile.NamedTemporaryFile('wb', dir=self.directory, suffix=".tmp", delete=False) as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, entry)
+            self._prune()
+        except Exception as e:
+            print(f"Cache write failed: {e}")
+
+    def _prune(self):
+        # Entries for edited or deleted books are never hit again; drop the
+        # oldest ones (by last use) until the cache fits in MAX_BYTES
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(".pickle"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.MAX_BYTES:
+                break
+            try:
+                os.remove(entry)
+                total -= size
+            except OSError:
+                pass
 
 # ---------------------------------------------------------------------------
 # GUI Components
@@ -108,9 +263,18 @@ class NotesPanel(wx.Panel):
 
 class ReaderPanel(wx.Panel):
     """Main reading area with support for TXT, PDF, EPUB."""
-    def __init__(self, parent, tts_service):
+    def __init__(self, parent, tts_service, page_cache):
         super().__init__(parent)
         self.tts_service = tts_service
+        self.page_cache = page_cache
+        self._load_token = 0
+        # Loads run one at a time, so MuPDF is never used from two threads;
+        # _loading_token is the load currently holding the lock
+        self._load_lock = threading.Lock()
+        self._loading_token = None
+        self._book_text = None
+        self._last_query = None
+        self._last_regex = None
         
         sizer = wx.BoxSizer(wx.VERTICAL)
         
@@ -158,8 +322,7 @@ class ReaderPanel(wx.Panel):
         self.SetSizer(sizer)
 
     def on_open_file(self, event):
-        wildcard = "eBooks (*.txt;*.pdf;*.epub)|*.txt;*.pdf;*.epub|Text (*.txt)|*.txt|PDF (*.pdf)|*.pdf|EPUB (*.epub)|*.epub"
-        with wx.FileDialog(self, "Open eBook", wildcard=wildcard,
+        with wx.FileDialog(self, "Open eBook", wildcard=self._WILDCARD,
                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
             if fileDialog.ShowModal() == wx.ID_CANCEL:
                 return
@@ -167,72 +330,162 @@ class ReaderPanel(wx.Panel):
             self._load_file(pathname)
 
     def _load_file(self, pathname):
+        # Extraction runs on a worker thread so the UI stays responsive
+        self._load_token += 1
         wx.BeginBusyCursor()
+        threading.Thread(target=self._bg_load, args=(self._load_token, pathname), daemon=True).start()
+
+    def _bg_load(self, token, pathname):
+        # Worker thread: no direct wx calls, results go back via wx.CallAfter
+        content, error = "", None
+        with self._load_lock:
+            self._loading_token = token
+            try:
+                self._check_cancelled()
+                ext = os.path.splitext(pathname)[1].lower()
+                reader = self._READERS.get(ext, ReaderPanel._read_unsupported)
+                content = reader(self, pathname)
+            except LoadCancelled:
+                pass  # _finish_load drops stale results
+            except Exception as e:
+                error = e
+        wx.CallAfter(self._finish_load, token, pathname, content, error)
+
+    def _check_cancelled(self):
+        # Loader thread: stop work on a load a newer Open has replaced
+        if self._loading_token != self._load_token:
+            raise LoadCancelled
+
+    def _finish_load(self, token, pathname, content, error):
         try:
-            ext = os.path.splitext(pathname)[1].lower()
-            content = ""
-            
-            if ext == '.txt':
-                with open(pathname, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-            elif ext == '.pdf':
-                content = self._read_pdf(pathname)
-            elif ext == '.epub':
-                content = self._read_epub(pathname)
-            else:
-                content = "Unsupported file format."
-
-            self.text_ctrl.SetValue(content)
+            # Ignore stale results if another file was opened in the meantime
+            if token != self._load_token:
+                return
+            if error:
+                wx.LogError(f"Cannot open file: {error}")
+                return
+            # If the fill fails part way, get_content() falls back to
+            # whatever the control holds rather than the old book's text
+            self._book_text = None
+            self._set_text_chunked(content)
+            # Only describe the new book once the control actually holds it
+            self._book_text = content
             self.title_lbl.SetLabel(os.path.basename(pathname))
-        except Exception as e:
-            wx.LogError(f"Cannot open file: {e}")
         finally:
             wx.EndBusyCursor()
 
+    def _set_text_chunked(self, content, chunk_size=64 * 1024):
+        # Appending in chunks while frozen avoids one huge SetValue relayout.
+        # No yielding in between: the control is frozen anyway, and a nested
+        # event loop would let another file open over a half-filled control
+        self.text_ctrl.Freeze()
+        try:
+            self.text_ctrl.Clear()
+            for i in range(0, len(content), chunk_size):
+                self.text_ctrl.AppendText(content[i:i + chunk_size])
+        finally:
+            self.text_ctrl.Thaw()
+        self.text_ctrl.SetInsertionPoint(0)
+
+    def _read_unsupported(self, path):
+        return "Unsupported file format."
+
+    def _read_txt(self, path):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+
     def _read_pdf(self, path):
-        if not PdfReader:
-            wx.CallAfter(wx.MessageBox, "pypdf library missing. Run: pip install pypdf", "Error", wx.ICON_ERROR)
-            return "Library missing: pypdf"
+        if not fitz and not PdfReader:
+            wx.CallAfter(wx.MessageBox, "PDF library missing. Run: pip install pymupdf", "Error", wx.ICON_ERROR)
+            return "Library missing: pymupdf or pypdf"
+        cached = self.page_cache.load(path)
+        if cached is not None:
+            return cached
         try:
-            reader = PdfReader(path)
-            text = []
-            for page in reader.pages:
-                extracted = page.extract_text()
-                if extracted:
-                    text.append(extracted)
-            return "\n".join(text)
+            content = self._join_text(self._iter_pdf_text(path), "\n")
+            self.page_cache.save(path, content)
+            return content
+        except LoadCancelled:
+            raise
         except Exception as e:
             return f"Error reading PDF: {e}"
 
     def _read_epub(self, path):
-        if not epub or not BeautifulSoup:
+        if not epub or not (SelectolaxParser or lxml or BeautifulSoup):
             wx.CallAfter(wx.MessageBox, "Libraries missing. Run: pip install ebooklib beautifulsoup4", "Error", wx.ICON_ERROR)
             return "Library missing: ebooklib or beautifulsoup4"
+        cached = self.page_cache.load(path)
+        if cached is not None:
+            return cached
         try:
-            book = epub.read_epub(path)
-            text = []
-            # Attempt to get title
-            title_meta = book.get_metadata('DC', 'title')
-            if title_meta:
-                 text.append(f"Title: {title_meta[0][0]}\n")
-            
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_body_content(), 'html.parser')
-                    text.append(soup.get_text())
-            return "\n\n".join(text)
+            content = self._join_text(self._iter_epub_text(path), "\n\n")
+            self.page_cache.save(path, content)
+            return content
+        except LoadCancelled:
+            raise
         except Exception as e:
              return f"Error reading EPUB: {e}"
 
+    def _iter_pdf_text(self, path):
+        if fitz:
+            # PyMuPDF parses in C, far faster than pypdf's pure-Python extraction
+            with fitz.open(path) as doc:
+                for page in doc:
+                    self._check_cancelled()
+                    yield page.get_text("text")
+        else:
+            for page in PdfReader(path).pages:
+                self._check_cancelled()
+                yield page.extract_text()
+
+    def _iter_epub_text(self, path):
+        book = epub.read_epub(path)
+        # Attempt to get title
+        title_meta = book.get_metadata('DC', 'title')
+        if title_meta:
+             yield f"Title: {title_meta[0][0]}\n"
+        
+        for item in book.get_items():
+            if item.get_type() == ebooklib.ITEM_DOCUMENT:
+                self._check_cancelled()
+                yield html_to_text(item.get_body_content())
+
+    @staticmethod
+    def _join_text(chunks, sep):
+        # Each page/chapter is written out and released as soon as it is
+        # extracted, instead of holding every piece until one final join
+        buf = io.StringIO()
+        first = True
+        for chunk in chunks:
+            if not chunk:
+                continue
+            if not first:
+                buf.write(sep)
+            buf.write(chunk)
+            first = False
+        return buf.getvalue()
+
+    # File dialog filter and per-extension readers, built once per class
+    _WILDCARD = "eBooks (*.txt;*.pdf;*.epub)|*.txt;*.pdf;*.epub|Text (*.txt)|*.txt|PDF (*.pdf)|*.pdf|EPUB (*.epub)|*.epub"
+    _READERS = {
+        '.txt': _read_txt,
+        '.pdf': _read_pdf,
+        '.epub': _read_epub,
+    }
+
     def get_content(self):
-        return self.text_ctrl.GetValue()
+        # The control is read-only, so the loaded text stays valid and
+        # callers don't pay for a fresh copy out of the native widget
+        if self._book_text is None:
+            self._book_text = self.text_ctrl.GetValue()
+        return self._book_text
 
     def on_read_aloud(self, event):
         selection = self.text_ctrl.GetStringSelection()
         if selection:
             self.tts_service.speak(selection)
         else:
-            full_text = self.text_ctrl.GetValue()
+            full_text = self.get_content()
             pos = self.text_ctrl.GetInsertionPoint()
             # Limit initial read buffer if very long to prevent lag
             self.tts_service.speak(full_text[pos:pos+5000])
@@ -245,18 +498,25 @@ class ReaderPanel(wx.Panel):
         if not query:
             return
         
-        full_text = self.text_ctrl.GetValue().lower()
-        query = query.lower()
+        # Case-insensitive regex over the original text, compiled once per query,
+        # so no lowercased copy of the book is needed
+        if query != self._last_query:
+            self._last_regex = re.compile(re.escape(query), re.IGNORECASE)
+            self._last_query = query
+        full_text = self.get_content()
         
+        # Search from current cursor, wrapping around to the start
         start_pos = self.text_ctrl.GetInsertionPoint()
-        found_pos = full_text.find(query, start_pos + 1)
-        
-        if found_pos == -1:
-             found_pos = full_text.find(query, 0)
-
-        if found_pos != -1:
-            self.text_ctrl.SetInsertionPoint(found_pos)
-            self.text_ctrl.SetSelection(found_pos, found_pos + len(query))
+        match = self._last_regex.search(full_text, start_pos + 1) or self._last_regex.search(full_text)
+
+        if match:
+            # Coalesce the caret and selection updates into one repaint
+            self.text_ctrl.Freeze()
+            try:
+                self.text_ctrl.SetInsertionPoint(match.start())
+                self.text_ctrl.SetSelection(match.start(), match.end())
+            finally:
+                self.text_ctrl.Thaw()
             self.text_ctrl.SetFocus()
         else:
             wx.MessageBox("Text not found.", "Search", wx.OK | wx.ICON_INFORMATION)
@@ -267,8 +527,9 @@ class MainFrame(wx.Frame):
         super().__init__(None, title="Offline Reader (TXT, PDF, EPUB)", size=(1000, 700))
 
         self.tts_service = TTSService()
+        self.page_cache = PageCache(os.path.join(wx.StandardPaths.Get().GetUserDataDir(), 'text'))
         self.splitter = wx.SplitterWindow(self)
-        self.reader_panel = ReaderPanel(self.splitter, self.tts_service)
+        self.reader_panel = ReaderPanel(self.splitter, self.tts_service, self.page_cache)
         self.notes_panel = NotesPanel(self.splitter)
 
         self.splitter.SplitVertically(self.reader_panel, self.notes_panel)
@@ -1,7 +1,14 @@
 import wx
 import wx.lib.newevent
 import os
+import hashlib
+import pickle
+import tempfile
 import threading
+import queue
+import functools
+from collections import OrderedDict
+import mmap
 import pyttsx3
 import warnings
 
@@ -9,6 +16,15 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module='ebooklib')
 
 # Optional libraries for formats
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:
+    try:
+        # PyMuPDF before 1.24.3 only has the deprecated fitz name
+        import fitz
+    except ImportError:
+        fitz = None
+
 try:
     from pypdf import PdfReader
 except ImportError:
@@ -17,11 +33,89 @@ except ImportError:
 try:
     import ebooklib
     from ebooklib import epub
-    from bs4 import BeautifulSoup
 except ImportError:
     epub = None
+
+# HTML text extractors, fastest first: selectolax, lxml, then BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
     BeautifulSoup = None
 
+def html_to_text(markup):
+    """Return the text of an EPUB chapter without building a soup tree when possible."""
+    if not markup:
+        return ""
+    if SelectolaxParser:
+        return SelectolaxParser(markup).text(separator='')
+    if lxml:
+        # lxml would guess latin-1 for raw bytes; ebooklib hands out UTF-8
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', 'replace')
+        try:
+            return lxml.html.fromstring(markup).text_content()
+        except lxml.etree.ParserError:
+            # Whitespace- or comment-only chapters have no document to parse
+            return ""
+    return BeautifulSoup(markup, 'html.parser').get_text()
+
+# Which extractor html_to_text uses; their output differs slightly, so
+# cached EPUB text and page offsets are only valid for the same one
+if SelectolaxParser:
+    HTML_EXTRACTOR = SelectolaxParser.__module__
+elif lxml:
+    HTML_EXTRACTOR = "lxml"
+else:
+    HTML_EXTRACTOR = "bs4" if BeautifulSoup else None
+
+# Likewise for cached PDF text: pymupdf and pypdf extract it differently
+PDF_BACKEND = "pymupdf" if fitz else "pypdf"
+
+class LoadCancelled(Exception):
+    """Raised on the loader thread when a newer Open has replaced the load."""
+
+# Shown instead of text for pages that only contain a scanned image
+SCANNED_PAGE_TEXT = "(Scanned image page - no text)"
+
+# Number of recently decoded lazy pages kept in memory
+PAGE_TEXT_CACHE_SIZE = 8
+
+# While a PDF streams in, the page counter is refreshed once per this many pages
+STREAM_LABEL_EVERY = 25
+
+def is_image_only_page(page):
+    """True if a PDF page draws images but has no text objects at all.
+
+    Checking the raw content stream for a text block (BT) costs a byte
+    scan, much less than running full text extraction. Pages using form
+    XObjects may keep their text there, so those are never skipped.
+    """
+    if page.get_xobjects() or not page.get_images():
+        return False
+    return b"BT" not in page.read_contents()
+
+def iter_pdf_pages(path, skip_image_only=True):
+    """Yield the text of each PDF page in order with PyMuPDF."""
+    with fitz.open(path) as doc:
+        for page in doc:
+            if skip_image_only and is_image_only_page(page):
+                yield SCANNED_PAGE_TEXT
+            else:
+                yield page.get_text("text")
+
 # ---------------------------------------------------------------------------
 # Offline Services
 # ---------------------------------------------------------------------------
@@ -30,38 +124,132 @@ class TTSService:
     """Handles Offline Text-to-Speech using pyttsx3."""
     def __init__(self):
         self.engine = None
-        self.is_speaking = False
-        try:
-            self.engine = pyttsx3.init()
-        except Exception as e:
-            print(f"TTS Init failed: {e}")
+        # (text, cancel) pairs waiting to be spoken
+        self._queue = queue.Queue()
+        # Each utterance has its own cancel Event, so a stop() can't be lost
+        # between the worker taking text and starting to speak it
+        self._cancel = threading.Event()
+        self._speaking = self._cancel
+
+        # A single long-lived worker creates the engine and runs every
+        # utterance, so the engine is only ever used from one thread (SAPI5
+        # and NSSpeechSynthesizer bind to the thread that created them)
+        ready = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._worker.start()
+        # Wait until init has succeeded or failed so speak()/stop() can
+        # tell whether TTS is available
+        ready.wait()
 
     def speak(self, text):
         if not self.engine:
             return
         
-        if self.is_speaking:
-            self.stop()
+        # Replace whatever is queued or playing with the new text
+        self.stop()
+        self._cancel = threading.Event()
+        self._queue.put((text, self._cancel))
 
-        self.is_speaking = True
-        
-        threading.Thread(target=self._speak_thread, args=(text,)).start()
-
-    def _speak_thread(self, text):
+    def _run(self, ready):
         try:
-            # Re-init in thread for safety
             engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
+            engine.connect('started-word', self._on_word)
+            self.engine = engine
         except Exception as e:
-            print(f"TTS Error: {e}")
+            print(f"TTS Init failed: {e}")
+            return
         finally:
-            self.is_speaking = False
+            ready.set()
+
+        while True:
+            text, cancel = self._queue.get()
+            if cancel.is_set():
+                continue
+            self._speaking = cancel
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+
+    def _on_word(self, name, location, length):
+        # Called from inside runAndWait() on the worker thread, the only
+        # place engine.stop() reliably interrupts the speech
+        if self._speaking.is_set():
+            self.engine.stop()
 
     def stop(self):
-        if self.engine and self.is_speaking:
-            self.engine.stop()
-            self.is_speaking = False
+        if not self.engine:
+            return
+        # Drop text that hasn't been picked up yet, then cut the current speech short
+        self._drop_pending()
+        # speak() always cancels the previous utterance first, so only the
+        # latest one can still be live
+        self._cancel.set()
+
+    def _drop_pending(self):
+        with self._queue.mutex:
+            self._queue.queue.clear()
+
+class PageCache:
+    """On-disk cache of extracted book text, keyed by path, mtime and size."""
+    # Least recently used entries are removed once the cache grows past this
+    MAX_BYTES = 256 * 1024 * 1024
+    # Bump when extraction output changes so old entries are ignored
+    VERSION = 2
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _entry_path(self, path, options):
+        st = os.stat(path)
+        key = (f"{self.VERSION}|{HTML_EXTRACTOR}|{PDF_BACKEND}|{options!r}|"
+               f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}")
+        return os.path.join(self.directory, hashlib.blake2b(key.encode()).hexdigest() + ".pickle")
+
+    def load(self, path, options=()):
+        # options: extraction settings the cached data depends on
+        try:
+            entry = self._entry_path(path, options)
+            with open(entry, 'rb') as f:
+                data = pickle.load(f)
+            # Mark as recently used so pruning keeps it
+            os.utime(entry)
+            return data
+        except Exception:
+            # Missing or unreadable entry: extract as usual
+            return None
+
+    def save(self, path, data, options=()):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            entry = self._entry_path(path, options)
+            # A unique temp file, so concurrent writes of one book can't collide
+            with tempfile.NamedTemporaryFile('wb', dir=self.directory, suffix=".tmp", delete=False) as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(f.name, entry)
+            self._prune()
+        except Exception as e:
+            print(f"Cache write failed: {e}")
+
+    def _prune(self):
+        # Entries for edited or deleted books are never hit again; drop the
+        # oldest ones (by last use) until the cache fits in MAX_BYTES
+        entries = []
+        with os.scandir(self.directory) as it:
+            for e in it:
+                if e.name.endswith(".pickle"):
+                    st = e.stat()
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.MAX_BYTES:
+                break
+            try:
+                os.remove(entry)
+                total -= size
+            except OSError:
+                pass
 
 # ---------------------------------------------------------------------------
 # GUI Components
@@ -104,11 +292,20 @@ class NotesPanel(wx.Panel):
 
 class ReaderPanel(wx.Panel):
     """Main reading area with Page Flipping support."""
-    def __init__(self, parent, tts_service):
+    def __init__(self, parent, tts_service, page_cache):
         super().__init__(parent)
         self.tts_service = tts_service
+        self.page_cache = page_cache
         self.pages = []
+        self._page_text_cache = OrderedDict()
         self.current_page_idx = 0
+        self._load_token = 0
+        # Loads run one at a time, so MuPDF is never used from two threads;
+        # _loading_token is the load currently holding the lock
+        self._load_lock = threading.Lock()
+        self._loading_token = None
+        # Loads whose first pages are already on screen
+        self._streamed_tokens = set()
         
         sizer = wx.BoxSizer(wx.VERTICAL)
         
@@ -159,8 +356,7 @@ class ReaderPanel(wx.Panel):
         self.SetSizer(sizer)
 
     def on_open_file(self, event):
-        wildcard = "eBooks (*.txt;*.pdf;*.epub)|*.txt;*.pdf;*.epub"
-        with wx.FileDialog(self, "Open eBook", wildcard=wildcard,
+        with wx.FileDialog(self, "Open eBook", wildcard=self._WILDCARD,
                            style=wx.FD_OPEN | wx.FD_FILE_MUST_EXIST) as fileDialog:
             if fileDialog.ShowModal() == wx.ID_CANCEL:
                 return
@@ -168,86 +364,228 @@ class ReaderPanel(wx.Panel):
             self._load_file(pathname)
 
     def _load_file(self, pathname):
+        # Extraction runs on a worker thread so the UI stays responsive
+        self._load_token += 1
         wx.BeginBusyCursor()
-        try:
-            ext = os.path.splitext(pathname)[1].lower()
-            new_pages = []
-            
-            if ext == '.txt':
-                new_pages = self._read_txt_pages(pathname)
-            elif ext == '.pdf':
-                new_pages = self._read_pdf_pages(pathname)
-            elif ext == '.epub':
-                new_pages = self._read_epub_pages(pathname)
-            else:
-                new_pages = ["Unsupported file format."]
-
-            if not new_pages:
-                new_pages = ["(Empty Book or Extraction Failed)"]
-
-            self.pages = new_pages
-            self.current_page_idx = 0
+        threading.Thread(target=self._bg_load, args=(self._load_token, pathname), daemon=True).start()
+
+    def _bg_load(self, token, pathname):
+        # Worker thread: no direct wx calls, results go back via wx.CallAfter
+        new_pages, error = [], None
+        with self._load_lock:
+            self._loading_token = token
+            try:
+                self._check_cancelled()
+                ext = os.path.splitext(pathname)[1].lower()
+                reader = self._READERS.get(ext, ReaderPanel._read_unsupported)
+                # Pages a reader hands over early are shown before it finishes
+                on_page = functools.partial(wx.CallAfter, self._append_page, token, pathname)
+                new_pages = reader(self, pathname, on_page)
+
+                if not new_pages:
+                    new_pages = ["(Empty Book or Extraction Failed)"]
+            except LoadCancelled:
+                pass  # _finish_load drops stale results
+            except Exception as e:
+                error = e
+                new_pages = [f"Error loading file: {e}"]
+        wx.CallAfter(self._finish_load, token, pathname, new_pages, error)
+
+    def _check_cancelled(self):
+        # Loader thread: stop work on a load a newer Open has replaced
+        if self._loading_token != self._load_token:
+            raise LoadCancelled
+
+    def _finish_load(self, token, pathname, new_pages, error):
+        # The busy cursor ends here, or with the first streamed page
+        streamed = token in self._streamed_tokens
+        if streamed:
+            self._streamed_tokens.discard(token)
+        else:
+            wx.EndBusyCursor()
+        # Ignore stale results if another file was opened in the meantime
+        if token != self._load_token:
+            return
+        if streamed and new_pages == self.pages:
+            # Already on screen page by page; keep the reader where they are
+            self._update_nav()
+            return
+        if error:
+            wx.LogError(f"Cannot open file: {error}")
+        else:
             self.title_lbl.SetLabel(os.path.basename(pathname))
-            self._update_display()
-            
-        except Exception as e:
-            wx.LogError(f"Cannot open file: {e}")
-            self.pages = [f"Error loading file: {e}"]
-            self.current_page_idx = 0
-            self._update_display()
-        finally:
+        self._show_pages(new_pages)
+
+    def _append_page(self, token, pathname, text):
+        # Ignore stale pages if another file was opened in the meantime
+        if token != self._load_token:
+            return
+        if token not in self._streamed_tokens:
+            # First page of this book replaces the previous one right away
+            self._streamed_tokens.add(token)
             wx.EndBusyCursor()
+            self.title_lbl.SetLabel(os.path.basename(pathname))
+            self._show_pages([text])
+            return
+        self.pages.append(text)
+        # Refresh on the second page too so Next is enabled straight away
+        if len(self.pages) == 2 or len(self.pages) % STREAM_LABEL_EVERY == 0:
+            self._update_nav()
+
+    def _show_pages(self, pages):
+        self.pages = pages
+        self._page_text_cache.clear()
+        self.current_page_idx = 0
+        # Drop cached chapters of the previous book
+        self._epub_item_text.cache_clear()
+        self._update_display()
+
+    def _read_unsupported(self, path, on_page=None):
+        return ["Unsupported file format."]
 
-    def _read_txt_pages(self, path):
-        # Chunk text file by ~3000 chars
-        with open(path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+    def _read_txt_pages(self, path, on_page=None):
+        # Map the file instead of reading it; pages are ~3000 byte ranges
+        # which are only decoded when shown
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if os.fstat(fd).st_size == 0:
+                return []
+            mm = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            # The mapping keeps its own handle; it is closed once the
+            # pages referencing it are dropped on the next load
+            os.close(fd)
         
         chunk_size = 3000
-        return [content[i:i+chunk_size] for i in range(0, len(content), chunk_size)]
-
-    def _read_pdf_pages(self, path):
-        if not PdfReader:
-            return ["Library missing: pypdf"]
+        pages = []
+        start, size = 0, len(mm)
+        while start < size:
+            end = min(start + chunk_size, size)
+            # Snap forward to the next line break so lines aren't split
+            newline = mm.find(b"\n", end, min(end + chunk_size, size))
+            if newline != -1:
+                end = newline + 1
+            else:
+                # No line break nearby: at least don't cut a UTF-8 sequence in half
+                while end < size and mm[end] & 0xC0 == 0x80:
+                    end += 1
+            pages.append(functools.partial(self._txt_page_text, mm, start, end))
+            start = end
+        return pages
+
+    @staticmethod
+    def _txt_page_text(mm, start, end):
+        return mm[start:end].decode('utf-8', 'replace').replace('\r\n', '\n')
+
+    def _read_pdf_pages(self, path, on_page=None, skip_image_only=True):
+        # on_page, if given, is called from this thread with each non-empty
+        # page as soon as it is extracted
+        if not fitz and not PdfReader:
+            return ["Library missing: pymupdf or pypdf"]
+        cached = self.page_cache.load(path, (skip_image_only,))
+        if cached is not None:
+            return cached
         try:
-            reader = PdfReader(path)
+            if fitz:
+                # PyMuPDF parses in C, far faster than pypdf's pure-Python extraction
+                pages_iter = iter_pdf_pages(path, skip_image_only)
+            else:
+                reader = PdfReader(path)
+                pages_iter = (page.extract_text() for page in reader.pages)
             pages_text = []
-            for page in reader.pages:
-                txt = page.extract_text()
-                if txt.strip():
-                    pages_text.append(txt)
-            return pages_text if pages_text else ["No text found in PDF."]
+            for txt in pages_iter:
+                self._check_cancelled()
+                if not txt.strip():
+                    continue
+                pages_text.append(txt)
+                if on_page:
+                    on_page(txt)
+            if not pages_text:
+                return ["No text found in PDF."]
+            self.page_cache.save(path, pages_text, (skip_image_only,))
+            return pages_text
+        except LoadCancelled:
+            raise
         except Exception as e:
             return [f"Error reading PDF: {e}"]
 
-    def _read_epub_pages(self, path):
-        if not epub or not BeautifulSoup:
+    def _index_epub(self, path, on_page=None):
+        # Pages are lazy: each one re-extracts its chapter when it is shown,
+        # so the whole book text is never held in memory at once
+        if not epub or not (SelectolaxParser or lxml or BeautifulSoup):
             return ["Libraries missing: ebooklib, beautifulsoup4"]
         try:
             book = epub.read_epub(path)
-            pages_text = []
-            
-            # Add Title Page
-            title_meta = book.get_metadata('DC', 'title')
-            if title_meta:
-                 pages_text.append(f"Title: {title_meta[0][0]}")
-
-            for item in book.get_items():
-                if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_body_content(), 'html.parser')
-                    text = soup.get_text()
-                    if len(text.strip()) > 100:
-                        # Chunk long chapters
-                        chunk_size = 3000
-                        if len(text) > chunk_size:
-                            chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
-                            pages_text.extend(chunks)
-                        else:
-                            pages_text.append(text)
-            return pages_text
+            # The index is cached, so a re-open skips parsing every chapter
+            index = self.page_cache.load(path)
+            if index is None:
+                index = self._build_epub_index(book)
+                self.page_cache.save(path, index)
+            return [page if isinstance(page, str) else functools.partial(self._epub_page_text, book, *page)
+                    for page in index]
         except Exception as e:
              return [f"Error reading EPUB: {e}"]
 
+    @staticmethod
+    def _build_epub_index(book):
+        # Text pages, or (item_id, offset, length) for chapter chunks
+        index = []
+        
+        # Add Title Page
+        title_meta = book.get_metadata('DC', 'title')
+        if title_meta:
+             index.append(f"Title: {title_meta[0][0]}")
+
+        chunk_size = 3000
+        for item in book.get_items():
+            if item.get_type() == ebooklib.ITEM_DOCUMENT:
+                # Only the length is kept, the text itself is discarded
+                text = html_to_text(item.get_body_content())
+                text_len = len(text) if len(text.strip()) > 100 else 0
+                # Chunk long chapters
+                for offset in range(0, text_len, chunk_size):
+                    index.append((item.get_id(), offset, chunk_size))
+        return index
+
+    @staticmethod
+    @functools.lru_cache(maxsize=8)
+    def _epub_item_text(book, item_id):
+        # Paging within a chapter reuses the parsed text instead of re-parsing
+        item = book.get_item_with_id(item_id)
+        return html_to_text(item.get_body_content())
+
+    @staticmethod
+    def _epub_page_text(book, item_id, offset, length):
+        try:
+            return ReaderPanel._epub_item_text(book, item_id)[offset:offset + length]
+        except Exception as e:
+            return f"Error reading EPUB: {e}"
+
+    # File dialog filter and per-extension readers, built once per class.
+    # TXT and EPUB pages are lazy and indexed quickly, so only PDF streams.
+    _WILDCARD = "eBooks (*.txt;*.pdf;*.epub)|*.txt;*.pdf;*.epub"
+    _READERS = {
+        '.txt': _read_txt_pages,
+        '.pdf': _read_pdf_pages,
+        '.epub': _index_epub,
+    }
+
+    def _get_page_text(self, idx):
+        page = self.pages[idx]
+        # Lazy pages are callables that produce their text on demand
+        if not callable(page):
+            return page
+        # Keep the last few decoded pages so Prev/Next doesn't decode them again
+        text = self._page_text_cache.get(idx)
+        if text is None:
+            text = page()
+            self._page_text_cache[idx] = text
+            if len(self._page_text_cache) > PAGE_TEXT_CACHE_SIZE:
+                self._page_text_cache.popitem(last=False)
+        else:
+            self._page_text_cache.move_to_end(idx)
+        return text
+
     def _update_display(self):
         total = len(self.pages)
         if total == 0:
@@ -260,10 +598,19 @@ class ReaderPanel(wx.Panel):
         # Ensure index is within bounds
         self.current_page_idx = max(0, min(self.current_page_idx, total - 1))
         
-        content = self.pages[self.current_page_idx]
-        self.text_ctrl.SetValue(content)
-        self.text_ctrl.SetInsertionPoint(0) # Scroll to top
+        content = self._get_page_text(self.current_page_idx)
+        # Coalesce the text and scroll updates into one repaint
+        self.text_ctrl.Freeze()
+        try:
+            self.text_ctrl.SetValue(content)
+            self.text_ctrl.SetInsertionPoint(0) # Scroll to top
+        finally:
+            self.text_ctrl.Thaw()
         
+        self._update_nav()
+
+    def _update_nav(self):
+        total = len(self.pages)
         self.page_lbl.SetLabel(f"{self.current_page_idx + 1} / {total}")
         
         # Update buttons
@@ -290,7 +637,7 @@ class ReaderPanel(wx.Panel):
             self.tts_service.speak(selection)
         else:
             # Read current page content
-            content = self.pages[self.current_page_idx]
+            content = self._get_page_text(self.current_page_idx)
             self.tts_service.speak(content)
 
     def on_stop_read(self, event):
@@ -302,8 +649,9 @@ class MainFrame(wx.Frame):
         super().__init__(None, title="Offline Reader (Page View)", size=(1100, 750))
 
         self.tts_service = TTSService()
+        self.page_cache = PageCache(os.path.join(wx.StandardPaths.Get().GetUserDataDir(), 'pages'))
         self.splitter = wx.SplitterWindow(self)
-        self.reader_panel = ReaderPanel(self.splitter, self.tts_service)
+        self.reader_panel = ReaderPanel(self.splitter, self.tts_service, self.page_cache)
         self.notes_panel = NotesPanel(self.splitter)
 
         self.splitter.SplitVertically(self.reader_panel, self.notes_panel)
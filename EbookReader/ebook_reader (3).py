@@ -2,6 +2,9 @@ import wx
 import wx.lib.newevent
 import os
 import threading
+import queue
+import functools
+from collections import OrderedDict
 import pyttsx3
 import warnings
 
@@ -9,6 +12,15 @@ import warnings
 warnings.filterwarnings("ignore", category=UserWarning, module='ebooklib')
 
 # Optional libraries
+try:
+    import pymupdf as fitz  # PyMuPDF
+except ImportError:
+    try:
+        # PyMuPDF before 1.24.3 only has the deprecated fitz name
+        import fitz
+    except ImportError:
+        fitz = None
+
 try:
     from pypdf import PdfReader
 except ImportError:
@@ -17,15 +29,52 @@ except ImportError:
 try:
     import ebooklib
     from ebooklib import epub
-    from bs4 import BeautifulSoup
 except ImportError:
     epub = None
+
+# HTML text extractors, fastest first: selectolax, lxml, then BeautifulSoup
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
     BeautifulSoup = None
 
+def html_to_text(markup):
+    """Return the text of an EPUB chapter without building a soup tree when possible."""
+    if not markup:
+        return ""
+    if SelectolaxParser:
+        return SelectolaxParser(markup).text(separator='')
+    if lxml:
+        # lxml would guess latin-1 for raw bytes; ebooklib hands out UTF-8
+        if isinstance(markup, bytes):
+            markup = markup.decode('utf-8', 'replace')
+        try:
+            return lxml.html.fromstring(markup).text_content()
+        except lxml.etree.ParserError:
+            # Whitespace- or comment-only chapters have no document to parse
+            return ""
+    return BeautifulSoup(markup, 'html.parser').get_text()
+
 # ---------------------------------------------------------------------------
 #  CONSTANTS & THEMES
 # ---------------------------------------------------------------------------
 
+# Number of recently decoded lazy pages kept in memory
+PAGE_TEXT_CACHE_SIZE = 8
+
 THEMES = {
     'Light': {
         'bg': '#FFFFFF', 'fg': '#2D3748', 'panel_bg': '#F7FAFC', 
@@ -54,35 +103,75 @@ class ModernButton(wx.Button):
 # ---------------------------------------------------------------------------
 
 class TTSService:
+    """Handles Offline Text-to-Speech using pyttsx3."""
     def __init__(self):
         self.engine = None
-        self.is_speaking = False
-        try:
-            self.engine = pyttsx3.init()
-        except:
-            pass
+        # (text, cancel) pairs waiting to be spoken
+        self._queue = queue.Queue()
+        # Each utterance has its own cancel Event, so a stop() can't be lost
+        # between the worker taking text and starting to speak it
+        self._cancel = threading.Event()
+        self._speaking = self._cancel
+
+        # A single long-lived worker creates the engine and runs every
+        # utterance, so the engine is only ever used from one thread (SAPI5
+        # and NSSpeechSynthesizer bind to the thread that created them)
+        ready = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._worker.start()
+        # Wait until init has succeeded or failed so speak()/stop() can
+        # tell whether TTS is available
+        ready.wait()
 
     def speak(self, text):
-        if self.is_speaking: self.stop()
-        self.is_speaking = True
-        threading.Thread(target=self._speak_thread, args=(text,)).start()
+        if not self.engine:
+            return
+        
+        # Replace whatever is queued or playing with the new text
+        self.stop()
+        self._cancel = threading.Event()
+        self._queue.put((text, self._cancel))
 
-    def _speak_thread(self, text):
+    def _run(self, ready):
         try:
             engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
-        except: pass
-        finally: self.is_speaking = False
+            engine.connect('started-word', self._on_word)
+            self.engine = engine
+        except Exception as e:
+            print(f"TTS Init failed: {e}")
+            return
+        finally:
+            ready.set()
+
+        while True:
+            text, cancel = self._queue.get()
+            if cancel.is_set():
+                continue
+            self._speaking = cancel
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+
+    def _on_word(self, name, location, length):
+        # Called from inside runAndWait() on the worker thread, the only
+        # place engine.stop() reliably interrupts the speech
+        if self._speaking.is_set():
+            self.engine.stop()
 
     def stop(self):
-        if self.is_speaking:
-            # This is a bit hacky for pyttsx3 in threads, but it attempts to stop
-            try:
-                # We can't easily stop a running loop in another thread with pyttsx3
-                # So we just reset flag. In a real robust app, we'd use a queue.
-                self.is_speaking = False
-            except: pass
+        if not self.engine:
+            return
+        # Drop text that hasn't been picked up yet, then cut the current speech short
+        self._drop_pending()
+        # speak() always cancels the previous utterance first, so only the
+        # latest one can still be live
+        self._cancel.set()
+
+    def _drop_pending(self):
+        with self._queue.mutex:
+            self._queue.queue.clear()
 
 # ---------------------------------------------------------------------------
 #  UI PANELS
@@ -142,6 +231,7 @@ class ReaderPanel(wx.Panel):
         self.tts_service = tts_service
         self.on_close = on_close_callback
         self.pages = []
+        self._page_text_cache = OrderedDict()
         self.current_page_idx = 0
         self.current_theme = 'Light'
         
@@ -247,15 +337,36 @@ class ReaderPanel(wx.Panel):
 
     def load_book(self, path, pages):
         self.pages = pages
+        self._page_text_cache.clear()
         self.current_page_idx = 0
         self.title_lbl.SetLabel(os.path.basename(path))
         self.slider.SetMax(len(pages) - 1 if pages else 0)
         self.update_display()
 
+    def get_page_text(self, idx):
+        page = self.pages[idx]
+        # Lazy pages are callables that produce their text on demand
+        if not callable(page):
+            return page
+        # Keep the last few decoded pages so Prev/Next doesn't decode them again
+        text = self._page_text_cache.get(idx)
+        if text is None:
+            text = page()
+            self._page_text_cache[idx] = text
+            if len(self._page_text_cache) > PAGE_TEXT_CACHE_SIZE:
+                self._page_text_cache.popitem(last=False)
+        else:
+            self._page_text_cache.move_to_end(idx)
+        return text
+
     def update_display(self):
         if not self.pages: return
-        self.text_ctrl.SetValue(self.pages[self.current_page_idx])
-        self.text_ctrl.SetInsertionPoint(0)
+        self.text_ctrl.Freeze()
+        try:
+            self.text_ctrl.SetValue(self.get_page_text(self.current_page_idx))
+            self.text_ctrl.SetInsertionPoint(0)
+        finally:
+            self.text_ctrl.Thaw()
         self.page_lbl.SetLabel(f"{self.current_page_idx + 1} / {len(self.pages)}")
         self.slider.SetValue(self.current_page_idx)
         
@@ -281,7 +392,7 @@ class ReaderPanel(wx.Panel):
 
     def on_read_click(self, e):
         if self.pages:
-            self.tts_service.speak(self.pages[self.current_page_idx])
+            self.tts_service.speak(self.get_page_text(self.current_page_idx))
 
     def on_back_click(self, e):
         self.tts_service.stop()
@@ -334,32 +445,56 @@ class MainFrame(wx.Frame):
         # ... Reuse extraction logic ...
         try:
             ext = os.path.splitext(path)[1].lower()
-            if ext == '.txt': return self._chunk_text(open(path,'r',encoding='utf-8',errors='replace').read())
+            if ext == '.txt':
+                with open(path, 'rb') as f:
+                    return self._chunk_text(f.read())
             elif ext == '.pdf': return self._read_pdf(path)
             elif ext == '.epub': return self._read_epub(path)
         except Exception as e:
             return [f"Error: {e}"]
         return ["Could not read file."]
 
-    def _chunk_text(self, text, size=3000):
-        return [text[i:i+size] for i in range(0, len(text), size)]
+    def _chunk_text(self, data, size=3000):
+        # Pages are (lo, hi) byte ranges of the raw file, decoded only when
+        # shown, so the book is never held as one decoded str
+        pages = []
+        lo, n = 0, len(data)
+        while lo < n:
+            hi = min(lo + size, n)
+            # Don't cut a UTF-8 sequence in half
+            while hi < n and data[hi] & 0xC0 == 0x80:
+                hi += 1
+            # Prefer ending the page on a line break
+            newline = data.rfind(b"\n", lo, hi)
+            if newline > lo:
+                hi = newline + 1
+            pages.append(functools.partial(self._decode_page, data, lo, hi))
+            lo = hi
+        return pages
+
+    @staticmethod
+    def _decode_page(data, lo, hi):
+        return data[lo:hi].decode('utf-8', 'replace').replace('\r\n', '\n')
 
     def _read_pdf(self, path):
-        if not PdfReader: return ["Please install pypdf"]
+        if not fitz and not PdfReader: return ["Please install pymupdf (or pypdf)"]
         try:
+            if fitz:
+                with fitz.open(path) as doc:
+                    texts = [p.get_text("text") for p in doc]
+                return [t for t in texts if t.strip()]
             reader = PdfReader(path)
             return [p.extract_text() for p in reader.pages if p.extract_text().strip()]
         except Exception as e: return [str(e)]
 
     def _read_epub(self, path):
-        if not epub: return ["Please install ebooklib beautifulsoup4"]
+        if not epub or not (SelectolaxParser or lxml or BeautifulSoup): return ["Please install ebooklib beautifulsoup4"]
         try:
             book = epub.read_epub(path)
             pages = []
             for item in book.get_items():
                 if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                    soup = BeautifulSoup(item.get_body_content(), 'html.parser')
-                    text = soup.get_text()
+                    text = html_to_text(item.get_body_content())
                     if len(text) > 200: pages.append(text)
             return pages
         except Exception as e: return [str(e)]
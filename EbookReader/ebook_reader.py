@@ -1,7 +1,9 @@
 import wx
 import wx.lib.newevent
 import os
+import re
 import threading
+import queue
 import pyttsx3
 
 # ---------------------------------------------------------------------------
@@ -12,41 +14,72 @@ class TTSService:
     """Handles Offline Text-to-Speech using pyttsx3."""
     def __init__(self):
         self.engine = None
-        self.is_speaking = False
-        try:
-            self.engine = pyttsx3.init()
-        except Exception as e:
-            print(f"TTS Init failed: {e}")
+        # (text, cancel) pairs waiting to be spoken
+        self._queue = queue.Queue()
+        # Each utterance has its own cancel Event, so a stop() can't be lost
+        # between the worker taking text and starting to speak it
+        self._cancel = threading.Event()
+        self._speaking = self._cancel
+
+        # A single long-lived worker creates the engine and runs every
+        # utterance, so the engine is only ever used from one thread (SAPI5
+        # and NSSpeechSynthesizer bind to the thread that created them)
+        ready = threading.Event()
+        self._worker = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._worker.start()
+        # Wait until init has succeeded or failed so speak()/stop() can
+        # tell whether TTS is available
+        ready.wait()
 
     def speak(self, text):
         if not self.engine:
             return
         
-        if self.is_speaking:
-            self.stop()
-
-        self.is_speaking = True
-        
-        # TTS engine block the loop, so we run it in a thread
-        threading.Thread(target=self._speak_thread, args=(text,)).start()
+        # Replace whatever is queued or playing with the new text
+        self.stop()
+        self._cancel = threading.Event()
+        self._queue.put((text, self._cancel))
 
-    def _speak_thread(self, text):
+    def _run(self, ready):
         try:
-            # We need a new engine instance for the thread or careful locking
-            # pyttsx3 is tricky with threads. 
-            # Safe approach: Run the loop inside the thread.
             engine = pyttsx3.init()
-            engine.say(text)
-            engine.runAndWait()
+            engine.connect('started-word', self._on_word)
+            self.engine = engine
         except Exception as e:
-            print(f"TTS Error: {e}")
+            print(f"TTS Init failed: {e}")
+            return
         finally:
-            self.is_speaking = False
+            ready.set()
 
-    def stop(self):
-        if self.engine and self.is_speaking:
+        while True:
+            text, cancel = self._queue.get()
+            if cancel.is_set():
+                continue
+            self._speaking = cancel
+            try:
+                self.engine.say(text)
+                self.engine.runAndWait()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+
+    def _on_word(self, name, location, length):
+        # Called from inside runAndWait() on the worker thread, the only
+        # place engine.stop() reliably interrupts the speech
+        if self._speaking.is_set():
             self.engine.stop()
-            self.is_speaking = False
+
+    def stop(self):
+        if not self.engine:
+            return
+        # Drop text that hasn't been picked up yet, then cut the current speech short
+        self._drop_pending()
+        # speak() always cancels the previous utterance first, so only the
+        # latest one can still be live
+        self._cancel.set()
+
+    def _drop_pending(self):
+        with self._queue.mutex:
+            self._queue.queue.clear()
 
 # ---------------------------------------------------------------------------
 # GUI Components
@@ -98,6 +131,9 @@ class ReaderPanel(wx.Panel):
     def __init__(self, parent, tts_service):
         super().__init__(parent)
         self.tts_service = tts_service
+        self._book_text = None
+        self._last_query = None
+        self._last_regex = None
         
         sizer = wx.BoxSizer(wx.VERTICAL)
         
@@ -154,12 +190,17 @@ class ReaderPanel(wx.Panel):
                 with open(pathname, 'r', encoding='utf-8') as f:
                     content = f.read()
                     self.text_ctrl.SetValue(content)
+                    self._book_text = content
                     self.title_lbl.SetLabel(os.path.basename(pathname))
             except IOError:
                 wx.LogError("Cannot open file.")
 
     def get_content(self):
-        return self.text_ctrl.GetValue()
+        # The control is read-only, so the loaded text stays valid and
+        # callers don't pay for a fresh copy out of the native widget
+        if self._book_text is None:
+            self._book_text = self.text_ctrl.GetValue()
+        return self._book_text
 
     def on_read_aloud(self, event):
         # Read selection or full text from cursor
@@ -168,7 +209,7 @@ class ReaderPanel(wx.Panel):
             self.tts_service.speak(selection)
         else:
             # Read from current insertion point roughly
-            full_text = self.text_ctrl.GetValue()
+            full_text = self.get_content()
             pos = self.text_ctrl.GetInsertionPoint()
             self.tts_service.speak(full_text[pos:])
 
@@ -180,20 +221,25 @@ class ReaderPanel(wx.Panel):
         if not query:
             return
         
-        full_text = self.text_ctrl.GetValue().lower()
-        query = query.lower()
+        # Case-insensitive regex over the original text, compiled once per query,
+        # so no lowercased copy of the book is needed
+        if query != self._last_query:
+            self._last_regex = re.compile(re.escape(query), re.IGNORECASE)
+            self._last_query = query
+        full_text = self.get_content()
         
-        # Simple search from current cursor
+        # Search from current cursor, wrapping around to the start
         start_pos = self.text_ctrl.GetInsertionPoint()
-        found_pos = full_text.find(query, start_pos + 1)
-        
-        if found_pos == -1:
-             # Wrap around
-             found_pos = full_text.find(query, 0)
+        match = self._last_regex.search(full_text, start_pos + 1) or self._last_regex.search(full_text)
 
-        if found_pos != -1:
-            self.text_ctrl.SetInsertionPoint(found_pos)
-            self.text_ctrl.SetSelection(found_pos, found_pos + len(query))
+        if match:
+            # Coalesce the caret and selection updates into one repaint
+            self.text_ctrl.Freeze()
+            try:
+                self.text_ctrl.SetInsertionPoint(match.start())
+                self.text_ctrl.SetSelection(match.start(), match.end())
+            finally:
+                self.text_ctrl.Thaw()
             self.text_ctrl.SetFocus()
         else:
             wx.MessageBox("Text not found.", "Search", wx.OK | wx.ICON_INFORMATION)